@@ -1,24 +1,25 @@
 #!/usr/bin/env python
 
-from collections import defaultdict
 from glob import glob
-from pathlib import Path
 
 import argparse
+import io
 import os
-import re
-import toml
-import yaml
+import string
 
+# yaml and rtoml are imported where they are used,
+# so that --help and early error exits do not pay for them
 
-PATTERN_SPEC = re.compile(r'^(?P<name>[\w-]*)(?P<version>.*)$')
+
+# conda and PyPI package names are ASCII, everything after the name is the version spec
+NAME_CHARS = string.ascii_letters + string.digits + "_-"
 
 
 def main():
     clargs = handle_clargs()
     inputs = explode_filenames(clargs.inputs)
     chans, envs, feat = collect_and_convert(inputs)
-    name = Path(".").absolute().name
+    name = os.path.basename(os.getcwd())
     pixi = build_pixi_toml(name, chans, envs, feat)
     write_toml(pixi, clargs.output, clargs.force)
 
@@ -34,55 +35,110 @@ def handle_clargs():
 def explode_filenames(fns):
     res = []
     for entry in fns:
-        path = Path(entry).expanduser()
-        if path.is_dir():
-            res += path.glob("*.yml")
-            res += path.glob("*.yaml")
+        path = os.path.expanduser(entry)
+        if os.path.isdir(path):
+            res.extend(iter_yamls(path))
         else:
-            res += glob(os.path.expanduser(entry))
+            res += glob(path)
 
     if not res:
         raise SystemExit("no input file(s) found")
 
-    res = [str(i) for i in res]
     return res
 
 
+def iter_yamls(path):
+    # a single scandir pass with a suffix check is cheaper than globbing for each pattern
+    with os.scandir(path) as it:
+        for entry in it:
+            if entry.name.endswith((".yml", ".yaml")) and entry.is_file():
+                yield entry.path
+
+
 def collect_and_convert(fns):
-    all_chans = []
+    # a dict keeps the channels unique in the order they are first seen, which is their priority
+    all_chans = {}
     envs = {}
     feat = {}
 
-    for fn in fns:
-        name, chans, deps = load_conda_yaml(fn)
-        conda, pip = split_conda_pip(deps)
+    results = load_and_split(fns)
+
+    # bound once here instead of looked up on every iteration
+    add_chans = all_chans.update
+    fromkeys = dict.fromkeys
 
-        all_chans.extend(chans)
+    for name, chans, conda, pip in results:
+        add_chans(fromkeys(chans))
         envs[name] = [name]
         feat[name] = {
             "dependencies": conda,
             "pypi-dependencies": pip
         }
 
-    all_chans = sorted(set(all_chans)) or ["conda-forge"]
+    all_chans = list(all_chans) or ["conda-forge"]
     return all_chans, envs, feat
 
 
-def load_conda_yaml(fn):
-    data = read_yaml(fn)
-    name = data.get("name", Path(fn).stem)
+def load_and_split(fns):
+    res = []
+    for fn, data in zip(fns, read_yamls(fns)):
+        name, chans, deps = unpack_conda_yaml(fn, data)
+        conda, pip = split_conda_pip(deps)
+        res.append((name, chans, conda, pip))
+    return res
+
+
+def unpack_conda_yaml(fn, data):
+    if "name" in data:
+        name = data["name"]
+    else:
+        name = os.path.splitext(os.path.basename(fn))[0]
     chans = data.get("channels", [])
     deps = data.get("dependencies", [])
     return name, chans, deps
 
 
-def read_yaml(fn):
-    with open(fn, "r") as f:
-        data = yaml.safe_load(f)
-    return data or {}
+def read_yamls(fns):
+    import yaml
+    try:
+        from yaml import CSafeLoader as Loader
+    except ImportError:
+        from yaml import SafeLoader as Loader
+
+    bufs = []
+    for fn in fns:
+        with open(fn, "rb") as f:
+            bufs.append(f.read())
+
+    docs = None
+    if len(bufs) > 1:
+        # parsing all files as one multi-document stream saves setting up a parser per file,
+        # the explicit document start in front of each file maps the documents back to the files
+        stream = b"".join(b"---\n" + buf + b"\n" for buf in bufs)
+        try:
+            docs = list(yaml.load_all(stream, Loader=Loader))
+        except yaml.YAMLError:
+            pass
+
+    # files with document markers of their own break that mapping, and errors should point to the right file,
+    # so in both cases (and for a single file) parse file by file instead
+    if docs is None or len(docs) != len(bufs):
+        docs = []
+        for fn, buf in zip(fns, bufs):
+            # bare bytes would show up as "<byte string>" in error marks, a named stream shows the file name
+            stream = io.BytesIO(buf)
+            stream.name = fn
+            try:
+                docs.append(yaml.load(stream, Loader=Loader))
+            except yaml.YAMLError as e:
+                raise SystemExit(str(e))
+
+    return [data or {} for data in docs]
 
 
 def split_conda_pip(deps):
+    if not deps:
+        return {}, {}
     conda, pip = split_conda_pip_raw(deps)
     conda = parse_deps(conda)
     pip = parse_deps(pip)
@@ -90,22 +146,26 @@ def split_conda_pip(deps):
 
 
 def split_conda_pip_raw(deps):
-    deps_by_type = split_by_type(deps)
-    conda = deps_by_type.pop("str")
-    dicts = deps_by_type.pop("dict")
-
-    if len(deps_by_type):
-        raise SystemExit(f"found entries of wrong type(s): {deps_by_type}")
-
+    conda = []
     pip = []
     remainder = []
-    for d in dicts:
-        if "pip" in d:
-            pip = d.pop("pip")
-            if d:
-                raise SystemExit(f"found too many entries in pip dict: {d}")
+    wrong = []
+    for d in deps:
+        if isinstance(d, str):
+            conda.append(d)
+        elif isinstance(d, dict):
+            if "pip" not in d:
+                remainder.append(d)
+                continue
+            if len(d) > 1:
+                extra = {k: v for k, v in d.items() if k != "pip"}
+                raise SystemExit(f"found too many entries in pip dict: {extra}")
+            pip.extend(d["pip"] or [])
         else:
-            remainder.append(d)
+            wrong.append(d)
+
+    if wrong:
+        raise SystemExit(f"found entries of wrong type(s): {wrong}")
 
     if remainder:
         raise SystemExit(f"found too many dicts: {remainder}")
@@ -113,61 +173,53 @@ def split_conda_pip_raw(deps):
     return conda, pip
 
 
-def split_by_type(seq):
-    res = defaultdict(list)
-    for i in seq:
-        tn = type(i).__name__
-        res[tn].append(i)
-    return res
-
-
 def parse_deps(deps):
-    res = {}
-    for entry in deps:
-        key, value = parse_dep(entry)
-        res[key] = value
-    return res
-
-
-def parse_dep(dep):
-    match = PATTERN_SPEC.match(dep)
-
-    if not match:
-        raise SystemExit(f"invalid package version spec: {dep}")
+    if not deps:
+        return {}
 
-    name = match.group("name")
-    version = match.group("version") or "*"
+    # parsing a single dep is inlined here to save a function call per entry
+    res = {}
+    for dep in deps:
+        version = dep.lstrip(NAME_CHARS)
+        name = dep[:len(dep) - len(version)]
+        version = version or "*"
 
-    # pixi seems to prefer "1.2.*" over "=1.2"
-    if version.startswith("=") and not version.startswith("=="):
-        version = convert_single_equals(version)
+        # pixi seems to prefer "1.2.*" over "=1.2"
+        if version.startswith("=") and not version.startswith("=="):
+            version = convert_single_equals(version)
 
-    return (name, version)
+        res[name] = version
+    return res
 
 
 def convert_single_equals(spec):
-    version = spec[1:]
-    if "=" in version:
+    if spec.find("=", 1) != -1:
         # we have a more complex case like "=1.2,<=2" or an included build number
         return spec
-    parts = version.split(".")
+    parts = spec[1:].split(".")
     if len(parts) < 3:
         parts.append("*")
     version = ".".join(parts)
     return version
 
 
-class TomlEncoder(toml.TomlEncoder):
-
-    def dump_list(self, v):
-        items = ", ".join(str(self.dump_value(i)) for i in v)
-        return f"[{items}]"
-
-
 def write_toml(data, fn, force):
+    import rtoml
+
+    text = space_tables(rtoml.dumps(data))
     mode = "w" if force else "x"
     with open(fn, mode) as f:
-        toml.dump(data, f, encoder=TomlEncoder())
+        f.write(text)
+
+
+def space_tables(text):
+    # rtoml does not always separate tables by an empty line, add it for readability
+    lines = []
+    for line in text.splitlines():
+        if line.startswith("[") and lines and lines[-1]:
+            lines.append("")
+        lines.append(line)
+    return "\n".join(lines) + "\n"
 
 
 def build_pixi_toml(name, channels, environments, feature):